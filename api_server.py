@@ -4,27 +4,47 @@ api_server.py - FastAPI Server for HR Chatbot with Integrated Authentication
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from passlib.context import CryptContext
 from typing import List, Optional, Dict, Any
+import asyncio
+import logging
 import uuid
-import json
+import orjson
 import os
+import threading
+import time
+from collections import deque
 from datetime import datetime, timedelta
 import jwt
-from backend import ask_hr_bot_api
+from cachetools import TTLCache
+from backend import ask_hr_bot_aapi, ask_hr_bot_astream, greeting_reply, warmup_hr_bot
+
+logger = logging.getLogger(__name__)
 
 # ==================== CONFIGURATION ====================
 SECRET_KEY = "your-secret-key-change-in-production"  # Change in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 USERS_FILE = "users.json"
+TOKEN_CACHE_SIZE = 10_000
+TOKEN_CACHE_TTL_SECONDS = 60
+MAX_ACTIVE_SESSIONS = 10_000
+SESSION_TTL_SECONDS = 86400  # Idle sessions expire after 24 hours
+SESSION_HISTORY_LIMIT = 50  # Exchanges kept per session
+GREETING_FAST_PATH_MAX_CHARS = 40  # Only short messages are checked for the greeting fast path
+RATINGS_FILE = "ratings.json"
+RATINGS_BATCH_SIZE = 100  # Max ratings per disk write
+RATINGS_FLUSH_INTERVAL_SECONDS = 0.5  # Max time a rating waits in the buffer
 
 # Initialize FastAPI app
 app = FastAPI(
     title="HR Chatbot API",
     description="API for Acme AI Ltd. HR Chatbot with Authentication",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -95,20 +115,47 @@ class SessionResponse(BaseModel):
 # ==================== HELPER FUNCTIONS ====================
 
 # User Database Functions
+# users.json is parsed once and then served from memory; writes go through to disk
+_users_cache: Optional[Dict[str, Dict[str, Any]]] = None
+_users_lock = threading.Lock()
+
 def load_users():
-    """Load users from JSON file"""
-    if not os.path.exists(USERS_FILE):
-        return {}
-    try:
-        with open(USERS_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return {}
+    """Load users from JSON file (cached in memory after the first read)"""
+    global _users_cache
+    if _users_cache is None:
+        if not os.path.exists(USERS_FILE):
+            _users_cache = {}
+        else:
+            try:
+                with open(USERS_FILE, 'rb') as f:
+                    _users_cache = orjson.loads(f.read())
+            except:
+                _users_cache = {}
+    return _users_cache
+
+def get_user(email: str) -> Optional[Dict[str, Any]]:
+    """Look up a single user by email"""
+    return load_users().get(email)
 
 def save_users(users):
     """Save users to JSON file"""
-    with open(USERS_FILE, 'w') as f:
-        json.dump(users, f, indent=2)
+    global _users_cache
+    _users_cache = users
+    tmp_file = USERS_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(orjson.dumps(users, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_file, USERS_FILE)
+
+def save_user(user: Dict[str, Any]) -> bool:
+    """Add a new user and persist the store; returns False if the email is already registered"""
+    with _users_lock:
+        # Checked under the lock: callers await between their own lookup and this write
+        users = load_users()
+        if user["email"] in users:
+            return False
+        users[user["email"]] = user
+        save_users(users)
+        return True
 
 # Password Functions
 def hash_password(password: str) -> str:
@@ -127,6 +174,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(truncated_password, hashed_password)
 
 # JWT Token Functions
+# Key bytes, algorithm list and decoder are built once instead of per request
+_SECRET_KEY_BYTES = SECRET_KEY.encode()
+_ALGORITHMS = [ALGORITHM]
+_jwt_decoder = jwt.PyJWT()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
     to_encode = data.copy()
@@ -136,21 +188,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, _SECRET_KEY_BYTES, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Verified payloads keyed by raw token, so replayed bearer tokens skip the HMAC check
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = threading.Lock()
+
 def decode_token(token: str):
     """Decode and verify JWT token"""
+    with _token_cache_lock:
+        payload = _token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        with _token_cache_lock:
+            _token_cache.pop(token, None)
+        raise HTTPException(status_code=401, detail="Token has expired")
+    
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        payload = _jwt_decoder.decode(token, _SECRET_KEY_BYTES, algorithms=_ALGORITHMS)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
-    except jwt.JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    with _token_cache_lock:
+        _token_cache[token] = payload
+    return payload
 
 # Authentication Dependency
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Get current user from token"""
     token = credentials.credentials
     payload = decode_token(token)
@@ -159,11 +227,10 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     if email is None:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    users = load_users()
-    if email not in users:
+    user = get_user(email)
+    if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    user = users[email]
     return UserResponse(
         email=user["email"],
         full_name=user["full_name"],
@@ -172,17 +239,110 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         created_at=user["created_at"]
     )
 
-# Session storage
-active_sessions = {}
+# Session storage (bounded, idle sessions are evicted after SESSION_TTL_SECONDS)
+active_sessions = TTLCache(maxsize=MAX_ACTIVE_SESSIONS, ttl=SESSION_TTL_SECONDS)
 
-def create_session():
+def create_session(now: Optional[datetime] = None):
     session_token = str(uuid.uuid4())
     active_sessions[session_token] = {
-        "created_at": datetime.now(),
-        "chat_history": []
+        "created_at": now or datetime.now(),
+        "chat_history": deque(maxlen=SESSION_HISTORY_LIMIT)
     }
     return session_token
 
+def touch_session(session_token: str) -> Optional[Dict[str, Any]]:
+    """Return a live session and push back its expiry, or None if it is gone"""
+    session = active_sessions.get(session_token)
+    if session is not None:
+        active_sessions[session_token] = session
+    return session
+
+def resolve_session(request: ChatRequest, now: datetime):
+    """Return (session_token, is_new_session) for a chat request"""
+    session_token = request.session_token
+    
+    if request.is_new_session or not session_token or touch_session(session_token) is None:
+        return create_session(now), True
+    return session_token, False
+
+def record_exchange(session_token: str, message: str, bot_response: str, user_email: str, timestamp: str):
+    """Append an exchange to the session chat history"""
+    if session_token in active_sessions:
+        active_sessions[session_token]["chat_history"].append({
+            "user": message,
+            "bot": bot_response,
+            "timestamp": timestamp,
+            "user_email": user_email
+        })
+
+# Ratings writer: /rate enqueues encoded JSON lines, a background task appends them in batches
+_ratings_queue: Optional[asyncio.Queue] = None
+_ratings_task: Optional[asyncio.Task] = None
+
+def append_ratings(lines: List[bytes]):
+    """Append a batch of rating lines to the ratings file with a single write"""
+    with open(RATINGS_FILE, "ab") as f:
+        f.write(b"".join(lines))
+        f.flush()
+        os.fsync(f.fileno())
+
+async def ratings_writer(queue: asyncio.Queue):
+    """Drain queued ratings and flush them to disk; a None item stops the writer"""
+    loop = asyncio.get_running_loop()
+    running = True
+    while running:
+        line = await queue.get()
+        if line is None:
+            break
+        
+        lines = [line]
+        deadline = loop.time() + RATINGS_FLUSH_INTERVAL_SECONDS
+        while len(lines) < RATINGS_BATCH_SIZE:
+            try:
+                line = await asyncio.wait_for(queue.get(), deadline - loop.time())
+            except asyncio.TimeoutError:
+                break
+            if line is None:
+                running = False
+                break
+            lines.append(line)
+        
+        try:
+            await run_in_threadpool(append_ratings, lines)
+        except Exception:
+            logger.exception("Error writing ratings")
+
+# ==================== LIFECYCLE ====================
+
+# Background bot warmup; kept referenced so the task isn't garbage-collected mid-run
+_warmup_task: Optional[asyncio.Task] = None
+
+async def warmup_bot():
+    """Warm up Ollama and the retrieval caches without holding up startup"""
+    try:
+        await run_in_threadpool(warmup_hr_bot)
+    except Exception:
+        logger.exception("Bot warmup failed")
+
+@app.on_event("startup")
+async def startup():
+    """Load the user store, warm up bcrypt, start the ratings writer, then warm up the bot in the background"""
+    global _ratings_queue, _ratings_task, _warmup_task
+    await run_in_threadpool(load_users)
+    # passlib loads and self-tests its bcrypt backend lazily on first use
+    await run_in_threadpool(pwd_context.hash, "warmup")
+    _ratings_queue = asyncio.Queue()
+    _ratings_task = asyncio.create_task(ratings_writer(_ratings_queue))
+    # Ollama loads models on first request; start that now, but don't make login/health wait for it
+    _warmup_task = asyncio.create_task(warmup_bot())
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush any buffered ratings"""
+    if _ratings_task is not None:
+        await _ratings_queue.put(None)
+        await _ratings_task
+
 # ==================== ENDPOINTS ====================
 
 @app.get("/")
@@ -206,14 +366,13 @@ async def register(user_data: UserRegister):
                 detail="Password must be 72 characters or less"
             )
         
-        users = load_users()
-        
-        # Check if user already exists
-        if user_data.email in users:
+        # Check if user already exists (fast path that skips bcrypt; save_user re-checks atomically
+        # because a concurrent registration can land while the hash is computed)
+        if get_user(user_data.email) is not None:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create user
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await run_in_threadpool(hash_password, user_data.password)
         user = {
             "email": user_data.email,
             "password": hashed_password,
@@ -224,8 +383,8 @@ async def register(user_data: UserRegister):
             "is_active": True
         }
         
-        users[user_data.email] = user
-        save_users(users)
+        if not await run_in_threadpool(save_user, user):
+            raise HTTPException(status_code=400, detail="Email already registered")
         
         # Create access token
         access_token = create_access_token(data={"sub": user_data.email})
@@ -251,16 +410,13 @@ async def register(user_data: UserRegister):
 async def login(user_data: UserLogin):
     """Login user and return token"""
     try:
-        users = load_users()
-        
         # Check if user exists
-        if user_data.email not in users:
+        user = get_user(user_data.email)
+        if user is None:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
-        user = users[user_data.email]
-        
         # Verify password
-        if not verify_password(user_data.password, user["password"]):
+        if not await run_in_threadpool(verify_password, user_data.password, user["password"]):
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Check if user is active
@@ -298,11 +454,10 @@ async def verify_user_token(token: str):
         payload = decode_token(token)
         email = payload.get("sub")
         
-        users = load_users()
-        if email not in users:
+        user = get_user(email)
+        if user is None:
             return {"valid": False, "user": None}
         
-        user = users[email]
         return {
             "valid": True,
             "user": {
@@ -324,30 +479,32 @@ async def chat_endpoint(
 ):
     """Protected chat endpoint - requires authentication"""
     try:
+        # One clock read per request, shared by the session and history entries
+        now = datetime.now()
+        
         # Session management
-        session_token = request.session_token
+        session_token, is_new_session = resolve_session(request, now)
         
-        if request.is_new_session or not session_token or session_token not in active_sessions:
-            session_token = create_session()
-            is_new_session = True
-        else:
-            is_new_session = False
+        # Greeting fast path: constant reply, skips the bot and ChatResponse validation
+        if len(request.message) < GREETING_FAST_PATH_MAX_CHARS:
+            greeting = greeting_reply(request.message.strip(), request.chat_history)
+            if greeting is not None:
+                record_exchange(session_token, request.message, greeting, current_user.email, now.isoformat())
+                return ORJSONResponse({
+                    "response": greeting,
+                    "session_token": session_token,
+                    "is_new_session": is_new_session
+                })
         
         # Get response from HR bot
-        bot_response = ask_hr_bot_api(
+        bot_response = await ask_hr_bot_aapi(
             question=request.message,
             chat_history=request.chat_history,
             session_id=session_token
         )
         
         # Update session chat history with user info
-        if session_token in active_sessions:
-            active_sessions[session_token]["chat_history"].append({
-                "user": request.message,
-                "bot": bot_response,
-                "timestamp": datetime.now().isoformat(),
-                "user_email": current_user.email
-            })
+        record_exchange(session_token, request.message, bot_response, current_user.email, now.isoformat())
         
         return ChatResponse(
             response=bot_response,
@@ -358,6 +515,34 @@ async def chat_endpoint(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(
+    request: ChatRequest,
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """
+    Protected streaming chat endpoint (Server-Sent Events) - requires authentication.
+    
+    Sends {"token": ...} events as the answer is generated, then a final
+    {"response": ..., "session_token": ..., "is_new_session": ...} event.
+    """
+    now = datetime.now()
+    session_token, is_new_session = resolve_session(request, now)
+    
+    async def event_stream():
+        events = ask_hr_bot_astream(
+            question=request.message,
+            chat_history=request.chat_history,
+            session_id=session_token
+        )
+        async for event in events:
+            if "response" in event:
+                record_exchange(session_token, request.message, event["response"], current_user.email, now.isoformat())
+                event = {**event, "session_token": session_token, "is_new_session": is_new_session}
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.post("/new-session", response_model=SessionResponse)
 async def new_session(current_user: UserResponse = Depends(get_current_user)):
     """Create new chat session - requires authentication"""
@@ -385,9 +570,8 @@ async def rate_response(
             "user_name": current_user.full_name
         }
         
-        # Save to file (in production, use database)
-        with open("ratings.json", "a") as f:
-            f.write(json.dumps(rating_data) + "\n")
+        # Buffered append to file (in production, use database)
+        _ratings_queue.put_nowait(orjson.dumps(rating_data) + b"\n")
         
         return RatingResponse(
             status="success",
@@ -431,11 +615,17 @@ async def delete_session(
         raise HTTPException(status_code=404, detail="Session not found")
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
     print(" Starting HR Chatbot API Server with Authentication...")
     uvicorn.run(
         "api_server:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        # uvloop is not available on Windows, fall back to the stock asyncio loop there
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        # Sessions live in process memory, so keep a single worker unless overridden
+        workers=int(os.getenv("UVICORN_WORKERS", "1")),
+        reload=False
     )
@@ -1,84 +1,337 @@
 """
 backend.py - Optimized HR Chatbot with Dynamic Top-K Retrieval
 """
-from langchain_core.prompts import ChatPromptTemplate
 from langchain_ollama.llms import OllamaLLM
-from vector import retriever, get_dynamic_retriever
+from vector import embeddings, get_dynamic_retriever, reset_vector_store, vector_store_changed
 from tools import calculator, context_awareness_filter
+from semantic_cache import SemanticCache, context_key
+from cachetools import TTLCache
+from collections import deque
+from itertools import islice
+from operator import attrgetter
+import asyncio
+import hashlib
+import io
+import logging
 import re
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import AsyncIterator, Callable, Iterable, Iterator, List, Dict, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Precompiled patterns used on every turn
+_GREETINGS = (
+    'hello', 'hi', 'hey', 'greetings', 'good morning',
+    'good afternoon', 'good evening', 'hi there', 'hey there',
+    'hello there', 'sup', 'whats up', 'yo', 'hiya', 'howdy',
+    'good day', 'salaam', 'assalam', 'salam'
+)
+_GREETING_WORDS = frozenset(g for g in _GREETINGS if ' ' not in g)
+_GREETING_BIGRAMS = frozenset(g for g in _GREETINGS if ' ' in g)
+_REF_WORDS = frozenset({'he', 'his', 'him', 'she', 'her', 'it', 'its', 'that', 'this', 'them', 'their'})
+
+# Substring keywords for intent routing, matched in a single pass by _INTENT_RE
+_INTENT_KEYWORDS = {
+    'coo': ('coo', 'chief operating officer', 'sadhli'),
+    'chairman': ('chairman', 'fatemy'),
+    'founder': ('founder', 'founded', 'sharek'),
+    'creator': ('who made you', 'who created you', 'creator'),
+    'greeting': ('hello', 'hi', 'hey', 'greetings'),
+    'employee_lookup': ('who is', 'who are', 'find employee', 'contact', 'email'),
+    'calculation': ('calculate', 'salary', 'breakdown', 'basic salary'),
+    'skip_calc': ('policy', 'sick', 'leave', 'paid'),
+}
+_KEYWORD_INTENT = {kw: intent for intent, kws in _INTENT_KEYWORDS.items() for kw in kws}
+# Zero-width lookahead so overlapping keywords are all found; longest first at each position
+_INTENT_RE = re.compile(
+    '(?=(' + '|'.join(map(re.escape, sorted(_KEYWORD_INTENT, key=len, reverse=True))) + '))'
+)
+_GREETING_STRIP = re.compile(r'[^\w\s]')
+_NON_WORD_RE = re.compile(r'\W+')
+_WORD_RE = re.compile(r'\w+')
+# Pure arithmetic, optionally phrased as "calculate ..." / "what is ...?"; must contain an operator.
+# ** and // are not calculator operators, so those questions are left to the LLM
+_MATH_RE = re.compile(
+    r"^(?!.*(?:\*\*|//))(?:(?:calculate|compute|what(?:'s| is))\s+)?([-+\d\s.()]*\d[\d\s.()]*[-+*/][-+*/\d\s.()]*)\??$",
+    re.IGNORECASE
+)
+_MATH_MAX_CHARS = 100  # Longer questions never take the calculator fast path
+_NAME_RE = re.compile(r'\b[A-Z][a-z]+\s[A-Z][a-z]+\b')
+_EMAIL_OR_NUMBER_RE = re.compile(r'\b\w+@\w+\.\w+\b|\b\d{10,}\b')
+_KEYPHRASE_RE = re.compile(_NAME_RE.pattern + '|' + _EMAIL_OR_NUMBER_RE.pattern)
+# Greeting/filler sentences at the start of a line, stacked ones removed in the same pass
+_GREETING_PREFIX_RE = re.compile(
+    r'^(?:'
+    r'Hello!.*?(?:\n|\.)'
+    r'|Hi!.*?(?:\n|\.)'
+    r'|Good (?:morning|afternoon|evening).*?(?:\n|\.)'
+    r"|I'm the HR Chatbot for Acme AI Ltd\.\s*"
+    r'|How can I (?:help|assist) you.*?\?\s*'
+    r"|I'd be happy to help.*?\.\s*"
+    r"|I see that you're.*?\.\s*"
+    r')+',
+    re.IGNORECASE | re.DOTALL | re.MULTILINE
+)
+
+def match_intents(question_lower: str) -> frozenset:
+    """Return every intent whose keywords occur in the lowercased question"""
+    return frozenset(_KEYWORD_INTENT[m.group(1)] for m in _INTENT_RE.finditer(question_lower))
+
+_page_content = attrgetter('page_content')
+
+# Plain functions behind the LangChain tools; the hot path skips tool dispatch and schema validation
+_filter_response = context_awareness_filter.func
+_calculate = calculator.func
+
+LLM_KEEP_ALIVE = "30m"
 
 # Setup the model with lower temperature for maximum accuracy and reduced hallucination
 model = OllamaLLM(
     model="llama3.2",
     temperature=0.0,  # Set to 0 for deterministic, factual responses
     max_tokens=1000,
+    keep_alive=LLM_KEEP_ALIVE,  # keep the model resident between requests instead of reloading it
+)
+
+GREETING_RESPONSE = "Hello! I'm the HR Chatbot for Acme AI Ltd. How can I help you with HR-related questions today?"
+FOLLOWUP_GREETING_RESPONSE = "Hello! How can I assist you?"
+# Fixed answers for executive/creator questions, checked in this order
+CANNED_ANSWERS = (
+    ('coo', "The Chief Operating Officer (COO) and Co-Founder of Acme AI Ltd. is Syed Sadhli Ahmed Roomy."),
+    ('chairman', "The Chairman of Acme AI Ltd. is Major Gen Syed Fatemy Ahmed Roomy (Retd)."),
+    ('founder', "Acme AI Ltd. was founded in 2020 by Syed Sharek Ahmed Roomy and co-founded by Syed Sadhli Ahmed Roomy."),
+    ('creator', "My creator is Probir Saha Shohom, an intern."),
+)
+CALC_MARKER = "CALCULATOR:"
+ERROR_RESPONSE = "I apologize, but I encountered an error processing your request. Please try again."
+
+# Streaming: buffer this many leading characters so greetings can be stripped before tokens are sent
+STREAM_HEAD_CHARS = 120
+
+# Chat history: exchanges kept per conversation
+HISTORY_LIMIT = 10
+
+# Common questions pre-embedded and pre-retrieved at startup so early traffic hits the caches
+WARMUP_QUERIES = (
+    "What is the leave policy?",
+    "How many annual leave days do I get?",
+    "What is the sick leave policy?",
+    "What is the salary structure?",
+    "What is the basic salary breakdown?",
+    "What are the office hours?",
+    "What is the late attendance policy?",
+    "How do I apply for leave?",
+    "What is the Eid bonus?",
+    "How do I contact HR?",
 )
 
+# Context budget per query type, in tokens (estimated at CHARS_PER_TOKEN characters per token)
+CONTEXT_TOKEN_LIMITS = {
+    'greeting': 125,
+    'employee_lookup': 375,
+    'calculation': 250,
+    'simple': 625,
+    'complex': 875
+}
+DEFAULT_CONTEXT_TOKENS = 625
+CHARS_PER_TOKEN = 4
+CONTEXT_SEPARATOR = "\n---\n"
+
+# Built context keyed by (normalized question, query type), so repeat questions skip embedding + search
+RETRIEVAL_CACHE_SIZE = 1024
+RETRIEVAL_CACHE_TTL_SECONDS = 600
+_retrieval_cache = TTLCache(maxsize=RETRIEVAL_CACHE_SIZE, ttl=RETRIEVAL_CACHE_TTL_SECONDS)
+_retrieval_cache_lock = threading.Lock()
+
+# Raw LLM output keyed by a digest of the full prompt, so identical prompts skip Ollama
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL_SECONDS = 3600
+_response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+_response_cache_lock = threading.Lock()
+
+# Final answers keyed by question embedding, so paraphrased repeats skip retrieval and the LLM
+SEMANTIC_CACHE_SIZE = 1024
+SEMANTIC_CACHE_THRESHOLD = 0.93
+SEMANTIC_CACHE_TTL_SECONDS = 3600
+_semantic_cache = SemanticCache(capacity=SEMANTIC_CACHE_SIZE, threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL_SECONDS)
+
+# How often requests check whether `python vector.py` re-synced the store on disk
+REINDEX_CHECK_SECONDS = 5.0
+_next_reindex_check = 0.0
+_reindex_lock = threading.Lock()
+
+# Concurrent async requests share one Ollama embedding call per batch window
+EMBED_BATCH_SIZE = 8
+EMBED_BATCH_WINDOW_SECONDS = 0.005
+
+class EmbeddingBatcher:
+    """Coalesces query embeddings requested on the event loop into batched calls to a CachedEmbedder"""
+    
+    def __init__(self, embedder, max_batch: int = EMBED_BATCH_SIZE, window_seconds: float = EMBED_BATCH_WINDOW_SECONDS):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.window_seconds = window_seconds
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()  # strong references so in-flight batches are not garbage collected
+    
+    async def embed(self, text: str) -> List[float]:
+        """Embed one query, sharing the request with others arriving in the same window"""
+        vector = self.embedder.cached_query(text)
+        if vector is not None:
+            return vector
+        
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Send everything pending as one batch"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._embed_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+    
+    async def _embed_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Embed a batch and resolve each caller's future"""
+        try:
+            vectors = await self.embedder.aembed_queries([text for text, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(vector)
+
+_embedding_batcher = EmbeddingBatcher(embeddings)
+
+def build_context(contents: Iterable[str], max_tokens: int) -> str:
+    """Join distinct retrieved contents with separators, stopping as soon as the token budget is spent"""
+    budget = max_tokens * CHARS_PER_TOKEN
+    parts = []
+    seen = set()  # overlapping splits often return the same chunk more than once
+    used = 0
+    for content in contents:
+        if content in seen:
+            continue
+        seen.add(content)
+        piece = CONTEXT_SEPARATOR + content if parts else content
+        remaining = budget - used
+        if len(piece) >= remaining:
+            parts.append(piece[:remaining])
+            break
+        parts.append(piece)
+        used += len(piece)
+    return "".join(parts)
+
+def bounded_history(chat_history: Optional[Sequence[Dict]]) -> deque:
+    """Return the last HISTORY_LIMIT exchanges as a bounded deque (deques are passed through)"""
+    if isinstance(chat_history, deque):
+        return chat_history
+    if not chat_history:
+        return deque(maxlen=HISTORY_LIMIT)
+    return deque(chat_history[-HISTORY_LIMIT:], maxlen=HISTORY_LIMIT)
+
+def clear_retrieval_cache():
+    """Drop cached retrieval results and answers (call after the vector store is rebuilt)"""
+    with _retrieval_cache_lock:
+        _retrieval_cache.clear()
+    with _response_cache_lock:
+        _response_cache.clear()
+    _semantic_cache.clear()
+
+def refresh_if_reindexed():
+    """Reopen the vector store and drop cached answers if it was re-synced since it was loaded"""
+    global _next_reindex_check
+    now = time.monotonic()
+    if now < _next_reindex_check:
+        return
+    with _reindex_lock:
+        if now < _next_reindex_check:
+            return
+        _next_reindex_check = now + REINDEX_CHECK_SECONDS
+        if vector_store_changed():
+            logger.info("Vector store was re-synced; reloading it and clearing cached answers")
+            reset_vector_store()
+            clear_retrieval_cache()
+
 class ConversationContextManager:
     """Manages conversation context intelligently"""
     
+    __slots__ = ()
+    
     @staticmethod
-    def format_history(chat_history: List[Dict], max_exchanges: int = 3) -> str:
-        """Format recent conversation history"""
+    def format_history(chat_history: Sequence[Dict], max_exchanges: int = 3) -> str:
+        """Format recent conversation history (accepts a list or a deque)"""
         if not chat_history:
             return ""
         
-        recent = chat_history[-max_exchanges:]
-        lines = ["RECENT CONVERSATION:"]
+        recent = islice(chat_history, max(0, len(chat_history) - max_exchanges), None)
+        buf = io.StringIO()
+        buf.write("RECENT CONVERSATION:")
         
         for i, exchange in enumerate(recent, 1):
-            lines.append(f"{i}. User: {exchange.get('user', '')}")
-            lines.append(f"   Bot: {exchange.get('bot', '')[:150]}...")
+            bot = exchange.get('bot', '')
+            buf.write(f"\n{i}. User: ")
+            buf.write(exchange.get('user', ''))
+            buf.write("\n   Bot: ")
+            buf.write(bot if len(bot) <= 150 else bot[:150])
+            buf.write("...")
         
-        return "\n".join(lines)
+        return buf.getvalue()
     
     @staticmethod
-    def has_reference(question: str) -> bool:
+    def has_reference(question: str, question_lower: Optional[str] = None) -> bool:
         """Check if question has pronouns or references"""
-        refs = ['he', 'his', 'him', 'she', 'her', 'it', 'its', 'that', 'this', 'them', 'their']
-        question_words = question.lower().split()
-        return any(ref in question_words for ref in refs)
+        if question_lower is None:
+            question_lower = question.lower()
+        return not _REF_WORDS.isdisjoint(question_lower.split())
     
     @staticmethod
-    def is_greeting(question: str) -> bool:
+    def is_greeting(question: str, question_lower: Optional[str] = None) -> bool:
         """Check if the input is a greeting"""
-        question_lower = question.lower().strip()
-        question_clean = re.sub(r'[^\w\s]', '', question_lower)
-        
-        greetings = [
-            'hello', 'hi', 'hey', 'greetings', 'good morning', 
-            'good afternoon', 'good evening', 'hi there', 'hey there',
-            'hello there', 'sup', 'whats up', 'yo', 'hiya', 'howdy',
-            'good day', 'salaam', 'assalam', 'salam'
-        ]
+        if question_lower is None:
+            question_lower = question.lower()
+        question_clean = _GREETING_STRIP.sub('', question_lower.strip())
         
         words = question_clean.split()
+        if len(words) > 4:
+            return False
         
-        if len(words) <= 4:
-            for greeting in greetings:
-                if greeting in question_lower or question_lower.startswith(greeting):
-                    return True
-        
-        return False
+        # Set lookups for single words, then for adjacent pairs ("good morning")
+        if not _GREETING_WORDS.isdisjoint(words):
+            return True
+        return not _GREETING_BIGRAMS.isdisjoint(map(' '.join, zip(words, words[1:])))
     
     @staticmethod
-    def classify_query_complexity(question: str) -> str:
+    def classify_query_complexity(question: str, intents: Optional[frozenset] = None) -> str:
         """
         Classify query complexity for optimal retrieval.
         
         Returns: 'simple', 'employee_lookup', 'calculation', 'greeting', 'complex'
         """
-        question_lower = question.lower()
-        
-        if any(word in question_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            return 'greeting'
-        
-        if any(word in question_lower for word in ['who is', 'who are', 'find employee', 'contact', 'email']):
-            return 'employee_lookup'
+        if intents is None:
+            intents = match_intents(question.lower())
         
-        if any(word in question_lower for word in ['calculate', 'salary', 'breakdown', 'basic salary']):
-            return 'calculation'
+        for query_type in ('greeting', 'employee_lookup', 'calculation'):
+            if query_type in intents:
+                return query_type
         
         # Check for complex queries
         if len(question.split()) > 15 or ('?' in question and question.count('?') > 1):
@@ -88,22 +341,14 @@ class ConversationContextManager:
 
 
 # ENHANCED OPTIMIZED PROMPT with added emphasis on accuracy and no hallucination
+# Static instructions come first and the per-turn slots last, so consecutive prompts share
+# the longest possible prefix and Ollama can reuse its KV cache for it
 optimized_prompt = """You are the official HR Assistant for Acme AI Ltd., designed to provide accurate, helpful, and professional support to employees.
 
-===============================================================================
-CONVERSATION CONTEXT:
-{history}
-
-KNOWLEDGE BASE (HR Policies, Employee Data, Procedures):
-{context}
-
-CURRENT EMPLOYEE QUERY: {question}
-===============================================================================
-
 YOUR CORE RESPONSIBILITIES:
 
 1. ACCURACY & TRUST (CRITICAL - NO HALLUCINATION ALLOWED)
-   - Answer EXCLUSIVELY from the knowledge base provided above. Do NOT use external knowledge, assumptions, or generalizations.
+   - Answer EXCLUSIVELY from the knowledge base provided below. Do NOT use external knowledge, assumptions, or generalizations.
    - If information is unavailable or unclear in the knowledge base, respond EXACTLY with:
      "I don't have that specific information in my current knowledge base. 
       Please contact HR at people@acmeai.tech or call +8801313094329 for accurate details."
@@ -176,174 +421,400 @@ YOUR CORE RESPONSIBILITIES:
    - For critical matters (termination, legal, sensitive), advise consulting HR directly
    - If query is outside HR scope, acknowledge and suggest appropriate department
 
+===============================================================================
+CONVERSATION CONTEXT:
+{history}
+
+KNOWLEDGE BASE (HR Policies, Employee Data, Procedures):
+{context}
+
+CURRENT EMPLOYEE QUERY: {question}
 ===============================================================================
 PROVIDE YOUR ANSWER NOW (Direct, No Greeting, Strictly from Context):
 """
 
-prompt = ChatPromptTemplate.from_template(optimized_prompt)
+# Static prompt segments around the {history}, {context} and {question} slots, split once at import
+# so each turn only joins strings. The "Human: " prefix matches what ChatPromptTemplate used to render.
+_pre_history, _rest = optimized_prompt.split("{history}")
+_pre_context, _rest = _rest.split("{context}")
+_pre_question, _post_question = _rest.split("{question}")
+_PROMPT_PARTS = ("Human: " + _pre_history, _pre_context, _pre_question, _post_question)
+del _pre_history, _pre_context, _pre_question, _post_question, _rest
+
+def greeting_reply(question: str, chat_history: Sequence[Dict], question_lower: Optional[str] = None) -> Optional[str]:
+    """Return the canned reply if the question is a greeting, otherwise None"""
+    if not ConversationContextManager.is_greeting(question, question_lower):
+        return None
+    return GREETING_RESPONSE if len(chat_history) == 0 else FOLLOWUP_GREETING_RESPONSE
 
 class HRChatbot:
     """Optimized HR Chatbot with Dynamic Top-K Retrieval"""
     
+    __slots__ = ('context_mgr', 'model', '_grounding_tokens')
+    
     def __init__(self):
         self.context_mgr = ConversationContextManager()
         self.model = model
-        self.retriever = retriever
+        self._grounding_tokens = ("", frozenset())  # (context, its token set) from the last check
     
     def answer(self, question: str, chat_history: Optional[List[Dict]] = None) -> str:
         """Generate contextually aware answer with optimized retrieval"""
         try:
-            chat_history = chat_history or []
-            question_stripped = question.strip()
-            
-            # DIRECT GREETING HANDLER
-            if self.context_mgr.is_greeting(question_stripped):
-                if len(chat_history) == 0:
-                    return "Hello! I'm the HR Chatbot for Acme AI Ltd. How can I help you with HR-related questions today?"
-                else:
-                    return "Hello! How can I assist you?"
-            
-            # DIRECT ANSWER FOR EXECUTIVE QUERIES - FIX FOR COO QUESTION
-            question_lower = question_stripped.lower()
-            
-            # Handle COO queries
-            if any(term in question_lower for term in ['coo', 'chief operating officer', 'sadhli']):
-                return "The Chief Operating Officer (COO) and Co-Founder of Acme AI Ltd. is Syed Sadhli Ahmed Roomy."
-            
-            # Handle Chairman queries
-            if any(term in question_lower for term in ['chairman', 'fatemy']):
-                return "The Chairman of Acme AI Ltd. is Major Gen Syed Fatemy Ahmed Roomy (Retd)."
-            
-            # Handle Founder queries
-            if any(term in question_lower for term in ['founder', 'founded', 'sharek']):
-                return "Acme AI Ltd. was founded in 2020 by Syed Sharek Ahmed Roomy and co-founded by Syed Sadhli Ahmed Roomy."
-            
-            # Handle "who made you" queries
-            if any(term in question_lower for term in ['who made you', 'who created you', 'creator']):
-                return "My creator is Probir Saha Shohom, an intern."
-            
-            # Classify query complexity
-            query_type = self.context_mgr.classify_query_complexity(question)
-            
-            # Format history only if question has references
-            if self.context_mgr.has_reference(question):
-                history_text = self.context_mgr.format_history(chat_history)
-            else:
-                history_text = ""
+            turn = self._prelude(question, chat_history, embeddings.embed_query)
+            if isinstance(turn, str):
+                return turn
             
-            # Get retriever with optimal k based on query type
-            dynamic_retriever = get_dynamic_retriever(question)
+            return self._epilogue(self._generate(turn[0]), turn)
             
-            # Get relevant documents with optimized k
-            retrieved_docs = dynamic_retriever.invoke(question)
-            
-            # Limit context to prevent overwhelming the model
-            context_limit = {
-                'greeting': 500,
-                'employee_lookup': 1500,
-                'calculation': 1000,
-                'simple': 2500,
-                'complex': 3500
-            }.get(query_type, 2500)
+        except Exception:
+            logger.exception("answer() failed")
+            return ERROR_RESPONSE
+    
+    async def aanswer(self, question: str, chat_history: Optional[List[Dict]] = None) -> str:
+        """Async version of answer; embedding and generation are awaited instead of blocking a thread"""
+        try:
+            turn = await self._aprelude(question, chat_history)
+            if isinstance(turn, str):
+                return turn
             
-            context_text = "\n---\n".join([doc.page_content for doc in retrieved_docs])
-            context_text = context_text[:context_limit]
+            return self._epilogue(await self._agenerate(turn[0]), turn)
             
-            # Build prompt
-            full_prompt = prompt.format(
-                history=history_text,
-                context=context_text,
-                question=question
-            )
+        except Exception:
+            logger.exception("aanswer() failed")
+            return ERROR_RESPONSE
+    
+    def answer_stream(self, question: str, chat_history: Optional[List[Dict]] = None) -> Iterator[Dict[str, str]]:
+        """
+        Stream the answer as it is generated.
+        
+        Yields {"token": ...} events while the model generates, then one final
+        {"response": ...} event with the cleaned, validated answer, which supersedes the tokens.
+        """
+        try:
+            turn = self._prelude(question, chat_history, embeddings.embed_query)
+            if isinstance(turn, str):
+                yield {"response": turn}
+                return
             
-            # Get response
-            response = self.model.invoke(full_prompt)
+            chunks = []
+            head_sent = False
+            for chunk in self._generate_stream(turn[0]):
+                chunks.append(chunk)
+                if head_sent:
+                    yield {"token": chunk}
+                    continue
+                
+                head = self._stream_head(chunks)
+                if head is not None:
+                    head_sent = True
+                    yield {"token": head}
             
-            # Clean response
-            cleaned = context_awareness_filter.invoke({"response": response})
-            cleaned = self._clean_followup(cleaned)
+            yield {"response": self._epilogue("".join(chunks), turn)}
             
-            # Handle calculations
-            cleaned = self._handle_calc(cleaned, question)
+        except Exception:
+            logger.exception("answer_stream() failed")
+            yield {"response": ERROR_RESPONSE}
+    
+    async def answer_astream(self, question: str, chat_history: Optional[List[Dict]] = None) -> AsyncIterator[Dict[str, str]]:
+        """
+        Async version of answer_stream for the API server.
+        
+        Embedding and generation are awaited on the model's async client, so a
+        worker serves other requests while Ollama is producing tokens.
+        """
+        try:
+            turn = await self._aprelude(question, chat_history)
+            if isinstance(turn, str):
+                yield {"response": turn}
+                return
             
-            # Additional accuracy check: If response doesn't seem grounded, defer
-            if not self._is_response_grounded(cleaned, context_text, question):
-                return "I don't have that specific information in my current knowledge base. Please contact HR at people@acmeai.tech or call +8801313094329 for accurate details."
+            chunks = []
+            head_sent = False
+            async for chunk in self._agenerate_stream(turn[0]):
+                chunks.append(chunk)
+                if head_sent:
+                    yield {"token": chunk}
+                    continue
+                
+                head = self._stream_head(chunks)
+                if head is not None:
+                    head_sent = True
+                    yield {"token": head}
             
-            # Final validation
-            if not cleaned or len(cleaned.strip()) < 5:
-                return "I apologize, but I couldn't generate a proper response. Could you please rephrase your question?"
+            yield {"response": self._epilogue("".join(chunks), turn)}
             
-            return cleaned.strip()
+        except Exception:
+            logger.exception("answer_astream() failed")
+            yield {"response": ERROR_RESPONSE}
+    
+    def _prelude(self, question: str, chat_history: Optional[List[Dict]], embed_query: Callable[[str], List[float]]) -> Union[str, Tuple[str, str, List[float], str, str]]:
+        """
+        Everything before generation, shared by all entry points.
+        
+        Returns a finished answer (canned, calculated or from the semantic cache), or
+        (prompt, context_text, question_vector, cache_key, question_lower) for _epilogue.
+        """
+        refresh_if_reindexed()
+        chat_history = bounded_history(chat_history)
+        
+        # Intent routing runs first so canned answers never touch retrieval or the model
+        question_stripped = question.strip()
+        question_lower = question_stripped.lower()
+        intents = match_intents(question_lower)
+        canned = self._canned_answer(question_stripped, question_lower, intents, chat_history)
+        if canned is not None:
+            return canned
+        
+        history_text = self._history_for(question, question_lower, chat_history)
+        
+        # Semantic cache: a near-identical question with the same history, names, numbers and intents reuses its answer
+        question_vector = embed_query(question)
+        cache_key = context_key(history_text, question, intents)
+        cached = _semantic_cache.lookup(question_vector, cache_key)
+        if cached is not None:
+            return cached
+        
+        full_prompt, context_text = self._build_prompt(question, question_lower, question_vector, history_text, intents)
+        return full_prompt, context_text, question_vector, cache_key, question_lower
+    
+    async def _aprelude(self, question: str, chat_history: Optional[List[Dict]]) -> Union[str, Tuple[str, str, List[float], str, str]]:
+        """Run _prelude off the event loop (retrieval uses the synchronous Chroma client), embedding through the batcher"""
+        loop = asyncio.get_running_loop()
+        
+        def embed_query(text: str) -> List[float]:
+            return asyncio.run_coroutine_threadsafe(_embedding_batcher.embed(text), loop).result()
+        
+        return await asyncio.to_thread(self._prelude, question, chat_history, embed_query)
+    
+    def _epilogue(self, response: str, turn: Tuple[str, str, List[float], str, str]) -> str:
+        """Finalize a generated response and store it in the semantic cache"""
+        _, context_text, question_vector, cache_key, question_lower = turn
+        final = self._finalize(response, context_text, question_lower)
+        _semantic_cache.put(question_vector, cache_key, final)
+        return final
+    
+    def warmup(self, common_queries: Iterable[str] = WARMUP_QUERIES):
+        """Load the LLM and embedding model in Ollama and pre-fill the retrieval caches"""
+        try:
+            # An empty prompt makes Ollama load the model weights without generating anything
+            self.model.invoke("")
             
-        except Exception as e:
-            print(f"Error in answer(): {str(e)}")
-            return "I apologize, but I encountered an error processing your request. Please try again."
+            for question in common_queries:
+                question_lower = question.strip().lower()
+                query_type = self.context_mgr.classify_query_complexity(question, match_intents(question_lower))
+                question_vector = embeddings.embed_query(question)
+                self._retrieve_context(question, question_lower, question_vector, query_type)
+        except Exception:
+            logger.exception("warmup() failed")
+    
+    def _stream_head(self, chunks: List[str]) -> Optional[str]:
+        """Cleaned head of the stream once enough text is buffered, otherwise None"""
+        # Greetings only ever appear at the start, so clean the buffered head once
+        head = "".join(chunks)
+        if len(head) < STREAM_HEAD_CHARS:
+            return None
+        trailing = head[len(head.rstrip()):]
+        return self._clean_followup(head) + trailing
+    
+    def _canned_answer(self, question_stripped: str, question_lower: str, intents: frozenset, chat_history: List[Dict]) -> Optional[str]:
+        """Return a fixed answer for greetings and executive queries, or None"""
+        # DIRECT GREETING HANDLER
+        greeting = greeting_reply(question_stripped, chat_history, question_lower)
+        if greeting is not None:
+            return greeting
+        
+        # DIRECT ANSWER FOR EXECUTIVE QUERIES - FIX FOR COO QUESTION
+        for intent, canned in CANNED_ANSWERS:
+            if intent in intents:
+                return canned
+        
+        # Arithmetic-only questions go straight to the calculator
+        math_match = len(question_stripped) <= _MATH_MAX_CHARS and _MATH_RE.match(question_stripped)
+        if math_match:
+            return _calculate(math_match.group(1))
+        
+        return None
+    
+    def _history_for(self, question: str, question_lower: str, chat_history: List[Dict]) -> str:
+        """Format history only if question has references"""
+        if self.context_mgr.has_reference(question, question_lower):
+            return self.context_mgr.format_history(chat_history)
+        return ""
+    
+    def _build_prompt(self, question: str, question_lower: str, question_vector: List[float], history_text: str, intents: frozenset) -> Tuple[str, str]:
+        """Retrieve context and render the full prompt; returns (prompt, context)"""
+        # Classify query complexity
+        query_type = self.context_mgr.classify_query_complexity(question, intents)
+        
+        # Get relevant documents with optimized k, limited to prevent overwhelming the model
+        context_text = self._retrieve_context(question, question_lower, question_vector, query_type)
+        
+        # Build prompt
+        p0, p1, p2, p3 = _PROMPT_PARTS
+        full_prompt = "".join((p0, history_text, p1, context_text, p2, question, p3))
+        return full_prompt, context_text
+    
+    def _finalize(self, response: str, context_text: str, question_lower: str) -> str:
+        """Clean, calculate and validate a raw model response"""
+        # Clean response
+        cleaned = _filter_response(response)
+        cleaned = self._clean_followup(cleaned)
+        
+        # Handle calculations
+        cleaned = self._handle_calc(cleaned, question_lower)
+        
+        # Additional accuracy check: If response doesn't seem grounded, defer
+        if not self._is_response_grounded(cleaned, context_text, question_lower):
+            return "I don't have that specific information in my current knowledge base. Please contact HR at people@acmeai.tech or call +8801313094329 for accurate details."
+        
+        # Final validation
+        if not cleaned or len(cleaned.strip()) < 5:
+            return "I apologize, but I couldn't generate a proper response. Could you please rephrase your question?"
+        
+        return cleaned.strip()
+    
+    def _retrieve_context(self, question: str, question_lower: str, question_vector: List[float], query_type: str) -> str:
+        """Return the truncated context for the question, reusing recent results for the same question"""
+        key = (_NON_WORD_RE.sub(' ', question_lower).strip(), query_type)
+        with _retrieval_cache_lock:
+            context_text = _retrieval_cache.get(key)
+        if context_text is not None:
+            return context_text
+        
+        # Get retriever with optimal k based on query type
+        dynamic_retriever = get_dynamic_retriever(question)
+        # Search with the embedding already computed for the semantic cache instead of re-embedding
+        retrieved_docs = dynamic_retriever.vectorstore.similarity_search_by_vector(
+            question_vector, k=dynamic_retriever.search_kwargs["k"]
+        )
+        context_text = build_context(
+            map(_page_content, retrieved_docs),
+            CONTEXT_TOKEN_LIMITS.get(query_type, DEFAULT_CONTEXT_TOKENS)
+        )
+        
+        with _retrieval_cache_lock:
+            _retrieval_cache[key] = context_text
+        return context_text
+    
+    def _generate(self, full_prompt: str) -> str:
+        """Invoke the model, reusing the previous output for an identical prompt"""
+        key = hashlib.blake2b(full_prompt.encode(), digest_size=16).hexdigest()
+        with _response_cache_lock:
+            response = _response_cache.get(key)
+        if response is not None:
+            return response
+        
+        response = self.model.invoke(full_prompt)
+        
+        with _response_cache_lock:
+            _response_cache[key] = response
+        return response
+    
+    async def _agenerate(self, full_prompt: str) -> str:
+        """Async counterpart of _generate"""
+        key = hashlib.blake2b(full_prompt.encode(), digest_size=16).hexdigest()
+        with _response_cache_lock:
+            response = _response_cache.get(key)
+        if response is not None:
+            return response
+        
+        response = await self.model.ainvoke(full_prompt)
+        
+        with _response_cache_lock:
+            _response_cache[key] = response
+        return response
+    
+    def _generate_stream(self, full_prompt: str) -> Iterator[str]:
+        """Stream model output chunks, replaying the cached output for an identical prompt"""
+        key = hashlib.blake2b(full_prompt.encode(), digest_size=16).hexdigest()
+        with _response_cache_lock:
+            response = _response_cache.get(key)
+        if response is not None:
+            yield response
+            return
+        
+        chunks = []
+        for chunk in self.model.stream(full_prompt):
+            chunks.append(chunk)
+            yield chunk
+        
+        with _response_cache_lock:
+            _response_cache[key] = "".join(chunks)
+    
+    async def _agenerate_stream(self, full_prompt: str) -> AsyncIterator[str]:
+        """Async counterpart of _generate_stream"""
+        key = hashlib.blake2b(full_prompt.encode(), digest_size=16).hexdigest()
+        with _response_cache_lock:
+            response = _response_cache.get(key)
+        if response is not None:
+            yield response
+            return
+        
+        chunks = []
+        async for chunk in self.model.astream(full_prompt):
+            chunks.append(chunk)
+            yield chunk
+        
+        with _response_cache_lock:
+            _response_cache[key] = "".join(chunks)
     
-    def _is_response_grounded(self, response: str, context: str, question: str) -> bool:
+    def _is_response_grounded(self, response: str, context: str, question_lower: str) -> bool:
         """Basic check to ensure response is grounded in context (simple heuristic)"""
         # Skip for greetings or very short responses
-        if len(response.strip()) < 20 or self.context_mgr.is_greeting(question):
+        if len(response.strip()) < 20 or self.context_mgr.is_greeting(question_lower, question_lower):
             return True
         
-        # Check if key entities in response appear in context (basic check)
-        response_lower = response.lower()
-        context_lower = context.lower()
-        
         # Extract potential key phrases (names, emails, etc.)
-        key_phrases = re.findall(r'\b[A-Z][a-z]+\s[A-Z][a-z]+\b|\b\w+@\w+\.\w+\b|\b\d{10,}\b', response)
+        key_phrases = _KEYPHRASE_RE.findall(response)
         if not key_phrases:
             return True  # No specific entities, assume ok
         
         # Check if at least one key phrase is in context
+        context_tokens = self._context_tokens(context)
         for phrase in key_phrases:
-            if phrase.lower() in context_lower:
+            if ' '.join(phrase.lower().split()) in context_tokens:
                 return True
         
         return False  # If no grounding found, likely hallucinated
     
+    def _context_tokens(self, context: str) -> frozenset:
+        """Lowercased word bigrams, emails and long numbers found in the context"""
+        cached_context, tokens = self._grounding_tokens
+        if cached_context is context:
+            return tokens
+        
+        context_lower = context.lower()
+        words = _WORD_RE.findall(context_lower)
+        tokens = set(map(' '.join, zip(words, islice(words, 1, None))))
+        tokens.update(_EMAIL_OR_NUMBER_RE.findall(context_lower))
+        tokens = frozenset(tokens)
+        
+        self._grounding_tokens = (context, tokens)
+        return tokens
+    
     def _clean_followup(self, text: str) -> str:
         """Remove ALL greetings from responses"""
-        patterns = [
-            r'^Hello!.*?(?:\n|\.)',
-            r'^Hi!.*?(?:\n|\.)',
-            r'^Good morning.*?(?:\n|\.)',
-            r'^Good afternoon.*?(?:\n|\.)',
-            r'^Good evening.*?(?:\n|\.)',
-            r"^I'm the HR Chatbot for Acme AI Ltd\.\s*",
-            r"^How can I help you.*?\?\s*",
-            r"^How can I assist you.*?\?\s*",
-            r"^I'd be happy to help.*?\.\s*",
-            r"^I see that you're.*?\.\s*",
-        ]
-        
-        original = text
-        for pattern in patterns:
-            text = re.sub(pattern, '', text, flags=re.IGNORECASE | re.DOTALL | re.MULTILINE)
-        
-        if text != original:
-            text = text.lstrip()
-        
-        return text.strip()
-    
-    def _handle_calc(self, text: str, question: str) -> str:
+        return _GREETING_PREFIX_RE.sub('', text).strip()
+    
+    def _handle_calc(self, text: str, question_lower: str) -> str:
         """Handle calculations"""
-        if "CALCULATOR:" not in text:
+        start = text.find(CALC_MARKER)
+        if start < 0:
             return text
         
-        match = re.search(r"CALCULATOR:\s*(.+)", text)
-        if not match:
+        # Expression runs from the marker to the end of its line
+        rest = text[start + len(CALC_MARKER):].lstrip()
+        end = rest.find("\n")
+        expression = (rest if end < 0 else rest[:end]).strip()
+        if not expression:
             return text
         
-        expression = match.group(1).strip()
-        
-        # Skip for policy questions
-        skip_words = ['policy', 'sick', 'leave', 'paid']
-        if any(w in question.lower() for w in skip_words):
-            return text.replace("CALCULATOR:", "").strip()
+        # Skip for policy questions: drop the marker line, keep the rest of the answer
+        if 'skip_calc' in match_intents(question_lower):
+            return (text[:start] + ("" if end < 0 else rest[end:])).strip()
         
         # Calculate
-        calc_result = calculator.invoke({"expression": expression})
+        calc_result = _calculate(expression)
         return calc_result
 
 
@@ -358,12 +829,30 @@ def ask_hr_bot_api(question: str, chat_history: Optional[List[Dict]] = None, ses
     """API wrapper"""
     return ask_hr_bot(question, chat_history, session_id)
 
+async def ask_hr_bot_aapi(question: str, chat_history: Optional[List[Dict]] = None, session_id: Optional[str] = None) -> str:
+    """Async API wrapper"""
+    return await hr_chatbot.aanswer(question, chat_history)
+
+def warmup_hr_bot():
+    """Warm up the model and caches before serving traffic"""
+    hr_chatbot.warmup()
+
+def ask_hr_bot_stream(question: str, chat_history: Optional[List[Dict]] = None, session_id: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """Streaming API wrapper"""
+    return hr_chatbot.answer_stream(question, chat_history)
+
+def ask_hr_bot_astream(question: str, chat_history: Optional[List[Dict]] = None, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, str]]:
+    """Async streaming API wrapper"""
+    return hr_chatbot.answer_astream(question, chat_history)
+
 
 if __name__ == "__main__":
     print(" HR Chatbot with Optimized Dynamic Top-K Retrieval")
     print("Commands: 'clear' | 'quit'\n")
     
-    chat_history = []
+    warmup_hr_bot()
+    
+    chat_history = deque(maxlen=HISTORY_LIMIT)
     
     while True:
         try:
@@ -372,25 +861,35 @@ if __name__ == "__main__":
             if not question:
                 continue
             
-            if question.lower() in ['quit', 'exit', 'q']:
+            command = question.lower()
+            if command in ('quit', 'exit', 'q'):
                 print("Goodbye!")
                 break
             
-            if question.lower() == 'clear':
-                chat_history = []
+            if command == 'clear':
+                chat_history.clear()
                 print("✓ History cleared")
                 continue
             
-            # Get answer
-            answer = ask_hr_bot(question, chat_history)
-            print(f"\nBot: {answer}")
+            # Stream the answer, then show the cleaned version if it differs from what was printed
+            print("\nBot: ", end="", flush=True)
+            streamed = []
+            for event in ask_hr_bot_stream(question, chat_history):
+                if "token" in event:
+                    streamed.append(event["token"])
+                    print(event["token"], end="", flush=True)
+                else:
+                    answer = event["response"]
+            
+            if not streamed:
+                print(answer)
+            elif "".join(streamed).strip() != answer:
+                print(f"\n\nBot: {answer}")
+            else:
+                print()
             
             # Update history
             chat_history.append({"user": question, "bot": answer})
-            
-            # Keep last 10
-            if len(chat_history) > 10:
-                chat_history = chat_history[-10:]
                 
         except KeyboardInterrupt:
             print("\n\nGoodbye!")
@@ -0,0 +1,102 @@
+"""
+semantic_cache.py - Embedding-similarity cache for chatbot answers
+"""
+import hashlib
+import re
+import threading
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# Tokens that change the answer even when the embeddings barely move: numbers,
+# capitalized words past the start of a sentence, acronyms and possessives ("john's")
+_EXACT_TERM_RE = re.compile(
+    r"\d+(?:[.,]\d+)*|(?<![.?!]\s)(?<!^)\b[A-Z][a-z]+\b|\b[A-Z]{2,}\b|\b\w+(?='s\b)"
+)
+
+
+def context_key(history_text: str, question: str, intents: Iterable[str]) -> str:
+    """
+    Key a cached answer must share with the new question before similarity counts.
+
+    Covers the history that went into the prompt, the question's numbers and
+    proper-noun tokens, and its intent set, so "John's salary" never answers
+    "Mary's salary" however close their embeddings are.
+    """
+    terms = sorted({term.lower() for term in _EXACT_TERM_RE.findall(question.strip())})
+    key = "\0".join((history_text, " ".join(terms), " ".join(sorted(intents))))
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+class SemanticCache:
+    """
+    Caches answers by question embedding.
+
+    A lookup hits when a stored question has cosine similarity >= threshold with the
+    new one AND was answered under the same context key (e.g. a hash of the history
+    that went into the prompt) no more than ttl seconds ago. Oldest entries are
+    overwritten once capacity is reached.
+    """
+
+    def __init__(self, capacity: int = 1024, threshold: float = 0.93, ttl: float = 3600):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self._matrix: Optional[np.ndarray] = None  # (capacity, dim) unit-length rows
+        self._context_keys: List[Optional[str]] = [None] * capacity
+        self._answers: List[Optional[str]] = [None] * capacity
+        self._stored_at = np.zeros(capacity, dtype=np.float64)  # time.monotonic() per row
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        """Return the vector as float32 with unit length"""
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def lookup(self, vector: Sequence[float], context_key: str) -> Optional[str]:
+        """Return the cached answer for the most similar question, or None"""
+        q = self._normalize(vector)
+        with self._lock:
+            if self._size == 0 or self._matrix.shape[1] != q.shape[0]:
+                return None
+
+            # One matrix-vector product scores every cached question; expired rows can't match
+            scores = self._matrix[:self._size] @ q
+            scores[self._stored_at[:self._size] < time.monotonic() - self.ttl] = -1.0
+            for row in np.argsort(-scores):
+                if scores[row] < self.threshold:
+                    break
+                if self._context_keys[row] == context_key:
+                    return self._answers[row]
+        return None
+
+    def put(self, vector: Sequence[float], context_key: str, answer: str):
+        """Store an answer, overwriting the oldest entry when full"""
+        q = self._normalize(vector)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != q.shape[0]:
+                self._matrix = np.zeros((self.capacity, q.shape[0]), dtype=np.float32)
+                self._size = 0
+                self._next = 0
+
+            row = self._next
+            self._matrix[row] = q
+            self._context_keys[row] = context_key
+            self._answers[row] = answer
+            self._stored_at[row] = time.monotonic()
+            self._next = (row + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+    def clear(self):
+        """Drop all cached answers"""
+        with self._lock:
+            self._matrix = None
+            self._context_keys = [None] * self.capacity
+            self._answers = [None] * self.capacity
+            self._size = 0
+            self._next = 0
@@ -0,0 +1,39 @@
+"""
+Tests for semantic_cache.py - run with: python -m pytest
+"""
+from semantic_cache import SemanticCache, context_key
+
+# Stand-in for two questions whose embeddings are nearly identical
+VECTOR = [0.6, 0.8, 0.0]
+NEAR_VECTOR = [0.6, 0.79, 0.01]
+
+
+def test_near_duplicate_question_hits():
+    cache = SemanticCache(capacity=4)
+    cache.put(VECTOR, context_key("", "What is the leave policy?", {"skip_calc"}), "answer")
+    assert cache.lookup(NEAR_VECTOR, context_key("", "what is the leave policy", {"skip_calc"})) == "answer"
+
+
+def test_different_names_do_not_share_an_entry():
+    cache = SemanticCache(capacity=4)
+    cache.put(VECTOR, context_key("", "What is John's salary?", {"calculation"}), "John's answer")
+    assert cache.lookup(NEAR_VECTOR, context_key("", "What is Mary's salary?", {"calculation"})) is None
+    assert cache.lookup(NEAR_VECTOR, context_key("", "what is mary's salary", {"calculation"})) is None
+
+
+def test_different_numbers_do_not_share_an_entry():
+    cache = SemanticCache(capacity=4)
+    cache.put(VECTOR, context_key("", "How many leave days after 5 years?", {"skip_calc"}), "answer")
+    assert cache.lookup(NEAR_VECTOR, context_key("", "How many leave days after 15 years?", {"skip_calc"})) is None
+
+
+def test_different_intents_do_not_share_an_entry():
+    cache = SemanticCache(capacity=4)
+    cache.put(VECTOR, context_key("", "who is the founder", {"founder", "employee_lookup"}), "answer")
+    assert cache.lookup(NEAR_VECTOR, context_key("", "who is the founder", {"employee_lookup"})) is None
+
+
+def test_different_history_does_not_share_an_entry():
+    cache = SemanticCache(capacity=4)
+    cache.put(VECTOR, context_key("User: Who is Rahim?", "What is his email?", {"employee_lookup"}), "answer")
+    assert cache.lookup(NEAR_VECTOR, context_key("User: Who is Karim?", "What is his email?", {"employee_lookup"})) is None
@@ -2,8 +2,62 @@
 tools.py - HR Calculator Tool with Improved Context Filter
 """
 from langchain_core.tools import tool
+from functools import cache, lru_cache
+import ast
+import logging
+import operator
 import re
 
+logger = logging.getLogger(__name__)
+
+# Context filter patterns, compiled once
+# Everything up to the first template marker and on to the start of the real answer
+_START_RE = re.compile(
+    r'^.*?(?:You are an HR Chatbot for Acme AI Ltd\.|CONTEXT FROM HR POLICIES:|HR KNOWLEDGE BASE:'
+    r'|INSTRUCTIONS:|CURRENT QUESTION:).*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
+    re.DOTALL | re.IGNORECASE
+)
+# Marker through the end of its line; [^\n]* cannot run past the line, so no lazy backtracking
+_INSTRUCTION_PATTERNS = [
+    re.compile(p + r'[^\n]*\n?', re.IGNORECASE)
+    for p in (
+        r'You are an HR Chatbot for Acme AI Ltd\.',
+        r'CONTEXT FROM HR POLICIES:',
+        r'HR KNOWLEDGE BASE:',
+        r'INSTRUCTIONS:',
+        r'CURRENT QUESTION:',
+        r'PROVIDE CONCISE ANSWER:',
+        r'###Question###',
+        r'###Answer###',
+    )
+]
+# Any marker the start/instruction patterns act on; without one those steps are no-ops
+_MARKER_RE = re.compile(
+    r'You are an HR Chatbot for Acme AI Ltd\.|CONTEXT FROM HR POLICIES:|HR KNOWLEDGE BASE:|INSTRUCTIONS:'
+    r'|CURRENT QUESTION:|PROVIDE CONCISE ANSWER:|###Question###|###Answer###',
+    re.IGNORECASE
+)
+# Whitespace around line breaks, including blank lines
+_LINE_BREAK_WS_RE = re.compile(r'\s*\n\s*')
+_BAD_STARTS = (
+    'You are an HR Chatbot',
+    'CONTEXT FROM',
+    'INSTRUCTIONS:',
+    'HR KNOWLEDGE BASE:',
+)
+
+# Calculator: arithmetic is evaluated by walking a whitelisted AST instead of eval()
+_CALC_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.USub: operator.neg,
+    ast.UAdd: operator.pos,
+}
+# Deletes every allowed character; anything left over means the input is not plain arithmetic
+_CALC_STRIP_ALLOWED = str.maketrans('', '', '0123456789+-*/.() ')
+
 @tool
 def context_awareness_filter(response: str) -> str:
     """
@@ -16,76 +70,50 @@ def context_awareness_filter(response: str) -> str:
     Returns:
         Cleaned response without prompt templates but with the actual answer
     """
+    return _filter_response(response)
+
+@lru_cache(maxsize=1024)
+def _filter_response(response: str) -> str:
+    """Body of context_awareness_filter, memoized since it is a pure function of the response"""
     try:
-        if not response or not response.strip():
+        # str.strip() returns the same object when there is nothing to strip
+        cleaned_response = response.strip() if response else ""
+        if not cleaned_response:
             return "I apologize, but I couldn't generate a response."
-            
-        original_response = response.strip()
-        
-        # Step 1: Split by "RESPONSE:" if it exists
-        if "RESPONSE:" in original_response:
-            parts = original_response.split("RESPONSE:", 1)
-            if len(parts) > 1 and parts[1].strip():
-                original_response = parts[1].strip()
-        
-        # Step 2: Remove template header block
-        cleaned_response = original_response
         
-        patterns_to_remove_from_start = [
-            r'^.*?You are an HR Chatbot for Acme AI Ltd\..*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
-            r'^.*?CONTEXT FROM HR POLICIES:.*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
-            r'^.*?HR KNOWLEDGE BASE:.*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
-            r'^.*?INSTRUCTIONS:.*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
-            r'^.*?CURRENT QUESTION:.*?(?=Hello|Hi|The |At |Yes|No|[A-Z][a-z])',
-        ]
-        
-        for pattern in patterns_to_remove_from_start:
-            before = cleaned_response
-            cleaned_response = re.sub(pattern, '', cleaned_response, flags=re.DOTALL | re.IGNORECASE)
-            if before != cleaned_response:
-                break
-        
-        # Step 3: Remove specific instruction lines
-        instruction_patterns = [
-            r'You are an HR Chatbot for Acme AI Ltd\..*?(?:\n|$)',
-            r'CONTEXT FROM HR POLICIES:.*?(?:\n|$)',
-            r'HR KNOWLEDGE BASE:.*?(?:\n|$)',
-            r'INSTRUCTIONS:.*?(?:\n|$)',
-            r'CURRENT QUESTION:.*?(?:\n|$)',
-            r'PROVIDE CONCISE ANSWER:.*?(?:\n|$)',
-            r'###Question###.*?(?:\n|$)',
-            r'###Answer###.*?(?:\n|$)',
-        ]
-        
-        for pattern in instruction_patterns:
-            cleaned_response = re.sub(pattern, '', cleaned_response, flags=re.IGNORECASE | re.MULTILINE)
-        
-        # Step 4: Clean up whitespace
-        lines = [line.strip() for line in cleaned_response.split('\n') if line.strip()]
-        cleaned_response = '\n'.join(lines)
+        # Step 1: Keep only what follows "RESPONSE:" if it exists
+        marker_at = cleaned_response.find("RESPONSE:")
+        if marker_at >= 0:
+            answer = cleaned_response[marker_at + len("RESPONSE:"):].strip()
+            if answer:
+                cleaned_response = answer
+        
+        # Most answers contain no template leakage, so one scan decides whether steps 2-3 run
+        if _MARKER_RE.search(cleaned_response):
+            # Step 2: Remove template header block
+            cleaned_response = _START_RE.sub('', cleaned_response, count=1)
+            
+            # Step 3: Remove specific instruction lines
+            for pattern in _INSTRUCTION_PATTERNS:
+                cleaned_response = pattern.sub('', cleaned_response)
         
-        # Step 5: Final validation
+        # Step 4: Clean up whitespace (strip every line, drop blank ones)
+        if '\n' in cleaned_response:
+            cleaned_response = _LINE_BREAK_WS_RE.sub('\n', cleaned_response)
         cleaned_response = cleaned_response.strip()
         
+        # Step 5: Final validation
         if not cleaned_response or len(cleaned_response) < 3:
             return "I apologize, but I couldn't generate a proper response. Please try rephrasing your question."
         
         # Check if output still has template content
-        bad_starts = [
-            'You are an HR Chatbot',
-            'CONTEXT FROM',
-            'INSTRUCTIONS:',
-            'HR KNOWLEDGE BASE:',
-        ]
-        
-        for bad_start in bad_starts:
-            if cleaned_response.startswith(bad_start):
-                return "I apologize, but I encountered an issue generating a response. Please try again."
+        if cleaned_response.startswith(_BAD_STARTS):
+            return "I apologize, but I encountered an issue generating a response. Please try again."
         
         return cleaned_response
         
-    except Exception as e:
-        print(f"Filter error: {e}")
+    except Exception:
+        logger.exception("Filter error")
         return "I apologize, but I encountered an error. Please try again."
     
 @tool
@@ -106,24 +134,32 @@ def calculator(expression: str) -> str:
     Returns:
         String with calculation result
     """
+    if not expression or expression.strip() == "":
+        return "Please provide a mathematical expression to calculate."
+    
+    expression = expression.strip()
+    
+    # Cheap character check before parsing: rejects words, exponents, hex etc. in one C-level pass
+    if expression.translate(_CALC_STRIP_ALLOWED):
+        return "❌ Error: Only basic arithmetic operations (+, -, *, /, .) and numbers are allowed."
+    
+    return _calculate(expression)
+
+def _eval_arithmetic(node):
+    """Evaluate a number/operator-only AST node; anything else raises ValueError"""
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    if isinstance(node, ast.BinOp) and type(node.op) in _CALC_OPERATORS:
+        return _CALC_OPERATORS[type(node.op)](_eval_arithmetic(node.left), _eval_arithmetic(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _CALC_OPERATORS:
+        return _CALC_OPERATORS[type(node.op)](_eval_arithmetic(node.operand))
+    raise ValueError("unsupported expression")
+
+@lru_cache(maxsize=256)
+def _calculate(expression: str) -> str:
+    """Evaluate a stripped expression and format the result (cached per expression)"""
     try:
-        if not expression or expression.strip() == "":
-            return "Please provide a mathematical expression to calculate."
-        
-        expression = expression.strip()
-        
-        # Safety check - only allow basic math operations
-        allowed_chars = set('0123456789+-*/.() ')
-        if not all(c in allowed_chars for c in expression):
-            return "❌ Error: Only basic arithmetic operations (+, -, *, /, .) and numbers are allowed."
-        
-        # Prevent dangerous operations
-        dangerous_patterns = ['import', 'exec', 'eval', '__', 'open', 'file']
-        if any(pattern in expression.lower() for pattern in dangerous_patterns):
-            return "❌ Error: Invalid expression for security reasons."
-        
-        # Evaluate safely
-        result = eval(expression)
+        result = _eval_arithmetic(ast.parse(expression, mode='eval').body)
         
         # Format nicely
         if isinstance(result, float):
@@ -138,11 +174,16 @@ def calculator(expression: str) -> str:
         return "❌ Error: Cannot divide by zero."
     except SyntaxError:
         return "❌ Error: Invalid mathematical expression."
+    except ValueError:
+        return "❌ Error: Only basic arithmetic operations (+, -, *, /, .) and numbers are allowed."
     except Exception as e:
         return f"❌ Calculation error: {str(e)}"
 
 # List of all available tools
 hr_tools = [calculator, context_awareness_filter]
 
-# Dictionary mapping for easy access
-TOOL_MAP = {tool.name: tool for tool in hr_tools}
+# Dictionary mapping for easy access, built on first use
+@cache
+def get_tool_map() -> dict:
+    """Return {tool name: tool} for hr_tools"""
+    return {t.name: t for t in hr_tools}
@@ -2,11 +2,25 @@
 from langchain_ollama import OllamaEmbeddings
 from langchain_chroma import Chroma
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_community.document_loaders import PyPDFLoader, JSONLoader
 from langchain_text_splitters import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
 import os 
 import json
+import hashlib
+import orjson
 import re
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from cachetools import TTLCache
+import chromadb
+try:
+    # Internal API, checked against the pinned chromadb==0.4.24; only used to drop a stale index
+    from chromadb.api.client import SharedSystemClient
+except ImportError:
+    SharedSystemClient = None
 
 # --- 1. Configuration ---
 
@@ -14,6 +28,27 @@ PDF_PATH = 'General HR Queries.pdf'
 EMPLOYEE_DATA_PATH = 'employees.json'
 HR_DATA_PATH = 'employee_data.json'
 
+# Ollama embedding model; point this at a quantized tag (e.g. an int8/q8_0 build) to cut
+# query-embedding latency. Rebuild the vector store after changing it.
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "mxbai-embed-large")
+
+# Final splitting of ingested documents
+FINAL_CHUNK_SIZE = 800      # Reduced from 1000 for more precise chunks
+FINAL_CHUNK_OVERLAP = 150   # Reduced from 200 to avoid too much duplication
+MIN_CHUNK_CHARS = 100       # PDF chunks shorter than this are merged into a neighbour
+
+# Query embeddings are cached in memory
+QUERY_EMBEDDING_CACHE_SIZE = 1024
+QUERY_EMBEDDING_CACHE_TTL_SECONDS = 3600
+
+# Document embedding (ingestion) is sent to Ollama in batches, several requests in flight
+DOCUMENT_EMBED_BATCH_SIZE = 64
+DOCUMENT_EMBED_WORKERS = 8
+
+# Document embeddings are also kept on disk, keyed by model and content, so rebuilding
+# the vector store only sends new or changed documents to Ollama
+DOCUMENT_EMBEDDING_CACHE_DIR = os.getenv("DOCUMENT_EMBEDDING_CACHE_DIR", "./embedding_cache")
+
 # TOP-K RELEVANCE CONFIGURATION
 # Optimized based on query complexity and context window
 TOP_K_CONFIG = {
@@ -25,25 +60,174 @@ TOP_K_CONFIG = {
     'executive': 4          # Executive queries (COO, Chairman, etc.)
 }
 
-embeddings = OllamaEmbeddings(
-    model="mxbai-embed-large",
-)
+class CachedEmbedder(Embeddings):
+    """Wraps an embedding model and remembers recent query embeddings and all document embeddings"""
+    
+    def __init__(self, embedder: Embeddings, model_name: str, maxsize: int = QUERY_EMBEDDING_CACHE_SIZE, ttl: float = QUERY_EMBEDDING_CACHE_TTL_SECONDS, cache_dir: str = DOCUMENT_EMBEDDING_CACHE_DIR):
+        self.embedder = embedder
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+    
+    def cached_query(self, text: str) -> Optional[List[float]]:
+        """Return the cached embedding for a query, or None"""
+        with self._lock:
+            return self._cache.get(text)
+    
+    def _remember(self, text: str, vector: List[float]):
+        with self._lock:
+            self._cache[text] = vector
+    
+    def _document_cache_path(self, text: str) -> str:
+        """Path of the on-disk embedding for a document under the current model"""
+        digest = hashlib.sha256(f"{self.model_name}\0{text}".encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+    
+    def _load_document_embedding(self, text: str) -> Optional[List[float]]:
+        try:
+            with open(self._document_cache_path(text), 'rb') as f:
+                return orjson.loads(f.read())
+        except (OSError, ValueError):
+            return None
+    
+    def _store_document_embedding(self, text: str, vector: List[float]):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self._document_cache_path(text), 'wb') as f:
+                f.write(orjson.dumps(vector))
+        except OSError as e:
+            print(f"Warning: Could not cache document embedding: {e}")
+    
+    def _embed_documents_batched(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents in batches, overlapping the Ollama round trips on a thread pool"""
+        if len(texts) <= DOCUMENT_EMBED_BATCH_SIZE:
+            return self.embedder.embed_documents(texts)
+        
+        batches = [texts[i:i + DOCUMENT_EMBED_BATCH_SIZE] for i in range(0, len(texts), DOCUMENT_EMBED_BATCH_SIZE)]
+        with ThreadPoolExecutor(max_workers=DOCUMENT_EMBED_WORKERS) as pool:
+            return [vector for batch in pool.map(self.embedder.embed_documents, batches) for vector in batch]
+    
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, sending each distinct text without an on-disk embedding to the model once"""
+        known = {}
+        for text in texts:
+            if text not in known:
+                known[text] = self._load_document_embedding(text)
+        missing = [text for text, vector in known.items() if vector is None]
+        if missing:
+            for text, vector in zip(missing, self._embed_documents_batched(missing)):
+                known[text] = vector
+                self._store_document_embedding(text, vector)
+        return [known[text] for text in texts]
+    
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedder.aembed_documents(texts)
+    
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cached_query(text)
+        if vector is None:
+            vector = self.embedder.embed_query(text)
+            self._remember(text, vector)
+        return vector
+    
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = self.cached_query(text)
+        if vector is None:
+            vector = await self.embedder.aembed_query(text)
+            self._remember(text, vector)
+        return vector
+    
+    async def aembed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries, sending only the uncached ones to the model in one call"""
+        vectors = [self.cached_query(text) for text in texts]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            fresh = await self.embedder.aembed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, fresh):
+                vectors[i] = vector
+                self._remember(texts[i], vector)
+        return vectors
+
+embeddings = CachedEmbedder(OllamaEmbeddings(
+    model=EMBEDDING_MODEL,
+), model_name=EMBEDDING_MODEL)
 
 db_location = "./chroma_hr_db"
 
-# Check if the database needs to be built
-add_documents = not os.path.exists(db_location)
+# Rewritten by every sync_vector_store run, so a running server can tell the store changed on disk
+SYNC_STAMP_PATH = os.path.join(db_location, "last_sync")
+
+# Default retriever for callers that don't use get_dynamic_retriever: MMR re-ranks the
+# FETCH_K nearest chunks down to K diverse ones, so near-duplicate chunks don't crowd the prompt
+DEFAULT_RETRIEVER_K = 10
+DEFAULT_RETRIEVER_FETCH_K = 40
+DEFAULT_RETRIEVER_LAMBDA = 0.5
+
+# HNSW settings, applied only when the collection is first created
+COLLECTION_METADATA = {
+    "hnsw:space": "cosine",
+    "hnsw:construction_ef": 200,
+    "hnsw:search_ef": 128,
+    "hnsw:M": 32,
+    # Buffer more inserts before updating the graph and persisting it during bulk builds
+    "hnsw:batch_size": 1000,
+    "hnsw:sync_threshold": 10000,
+    "hnsw:num_threads": os.cpu_count() or 1,
+}
 
 # --- 2. Ingestion or Loading Logic ---
 
-if add_documents:
-    print("Building new vector store from PDF and employee data...")
+# (EmployeeDetails key, "Team:" label, metadata team) for each employee team
+EMPLOYEE_TEAMS = (
+    ("OperationTeam", "Operation Team", "operation"),
+    ("StrategicInterventions", "Strategic Interventions", "strategic"),
+    ("AdditionalTeams", "Additional Teams", "additional"),
+)
+
+def _make_employee_doc(employee: dict, team_label: str, team_meta: str) -> Document:
+    """Build the retrieval document for one team member"""
+    doc_text = f"""
+            Employee: {employee["EmployeeName"]}
+            Position: {employee["Position"]}
+            Email: {employee["Email"]}
+            Table: {employee["Table"]}
+            Blood Group: {employee["BloodGroup"]}
+            Team: {team_label}
+            """
+    return Document(
+        page_content=doc_text,
+        metadata={"source": "employees.json", "type": "employee", "team": team_meta}
+    )
+
+def _merge_small_chunks(docs: List[Document]) -> List[Document]:
+    """Merge chunks shorter than MIN_CHUNK_CHARS into the previous chunk under the same top-level header"""
+    merged = []
+    for doc in docs:
+        prev = merged[-1] if merged else None
+        if (prev is not None
+                and min(len(prev.page_content), len(doc.page_content)) < MIN_CHUNK_CHARS
+                and len(prev.page_content) + 1 + len(doc.page_content) <= FINAL_CHUNK_SIZE
+                and prev.metadata.get("Header 1") == doc.metadata.get("Header 1")):
+            prev.page_content += "\n" + doc.page_content
+        else:
+            merged.append(doc)
+    return merged
+
+def _document_id(doc: Document) -> str:
+    """Stable id for a document, derived from its text and metadata"""
+    payload = f"{doc.page_content}\0{json.dumps(doc.metadata, sort_keys=True, default=str)}"
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+def _load_source_documents() -> List[Document]:
+    """Load and split the PDF, employee and HR data into the documents to index"""
+    print("Loading documents from PDF and employee data...")
     
     all_documents = []
     
     # **STEP A: Load the PDF document**
+    # Pages are read lazily, one at a time, by the splitting loop below
     loader = PyPDFLoader(PDF_PATH)
-    pages = loader.load() 
     
     # **STEP B: Use MarkdownHeaderTextSplitter for better structure**
     headers_to_split_on = [
@@ -58,78 +242,42 @@ if add_documents:
         strip_headers=False
     )
     
+    # Fallback to RecursiveCharacterTextSplitter if markdown splitting fails
+    fallback_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    
     # Process each page with markdown splitter
-    for page in pages:
+    for page in loader.lazy_load():
+        # Add metadata for better traceability
+        page_metadata = {"source": PDF_PATH, "page": page.metadata.get("page", "unknown"), "type": "pdf"}
         try:
             split_docs = markdown_splitter.split_text(page.page_content)
             for doc in split_docs:
-                # Add metadata for better traceability
-                doc.metadata.update({"source": PDF_PATH, "page": page.metadata.get("page", "unknown"), "type": "pdf"})
+                doc.metadata.update(page_metadata)
             all_documents.extend(split_docs)
         except Exception as e:
             print(f"Warning: Could not split page with markdown: {e}")
-            # Fallback to RecursiveCharacterTextSplitter if markdown splitting fails
-            fallback_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-            fallback_docs = fallback_splitter.split_text(page.page_content)
-            for chunk in fallback_docs:
-                all_documents.append(Document(
-                    page_content=chunk,
-                    metadata={"source": PDF_PATH, "page": page.metadata.get("page", "unknown"), "type": "pdf"}
-                ))
+            all_documents.extend(
+                Document(page_content=chunk, metadata=dict(page_metadata))
+                for chunk in fallback_splitter.split_text(page.page_content)
+            )
     
+    # Header-only and other tiny chunks carry little meaning on their own
+    all_documents = _merge_small_chunks(all_documents)
     print(f"Processed PDF into {len(all_documents)} markdown-structured documents.")
 
     # **STEP C: Load and process employee data**
     try:
-        with open(EMPLOYEE_DATA_PATH, 'r', encoding='utf-8') as f:
-            employee_data = json.load(f)
+        with open(EMPLOYEE_DATA_PATH, 'rb') as f:
+            employee_data = orjson.loads(f.read())
         
         employee_docs = []
         
-        # Process Operation Team
-        for employee in employee_data["EmployeeDetails"]["OperationTeam"]:
-            doc_text = f"""
-            Employee: {employee["EmployeeName"]}
-            Position: {employee["Position"]}
-            Email: {employee["Email"]}
-            Table: {employee["Table"]}
-            Blood Group: {employee["BloodGroup"]}
-            Team: Operation Team
-            """
-            employee_docs.append(Document(
-                page_content=doc_text,
-                metadata={"source": "employees.json", "type": "employee", "team": "operation"}
-            ))
-        
-        # Process Strategic Interventions
-        for employee in employee_data["EmployeeDetails"]["StrategicInterventions"]:
-            doc_text = f"""
-            Employee: {employee["EmployeeName"]}
-            Position: {employee["Position"]}
-            Email: {employee["Email"]}
-            Table: {employee["Table"]}
-            Blood Group: {employee["BloodGroup"]}
-            Team: Strategic Interventions
-            """
-            employee_docs.append(Document(
-                page_content=doc_text,
-                metadata={"source": "employees.json", "type": "employee", "team": "strategic"}
-            ))
-        
-        # Process Additional Teams
-        for employee in employee_data["EmployeeDetails"]["AdditionalTeams"]:
-            doc_text = f"""
-            Employee: {employee["EmployeeName"]}
-            Position: {employee["Position"]}
-            Email: {employee["Email"]}
-            Table: {employee["Table"]}
-            Blood Group: {employee["BloodGroup"]}
-            Team: Additional Teams
-            """
-            employee_docs.append(Document(
-                page_content=doc_text,
-                metadata={"source": "employees.json", "type": "employee", "team": "additional"}
-            ))
+        # Operation, Strategic and Additional team members share one document layout
+        for team_key, team_label, team_meta in EMPLOYEE_TEAMS:
+            employee_docs.extend(
+                _make_employee_doc(employee, team_label, team_meta)
+                for employee in employee_data["EmployeeDetails"][team_key]
+            )
         
         # Process Project Coordinators
         for coordinator in employee_data["EmployeeDetails"]["ProjectCoordinators"]:
@@ -166,8 +314,8 @@ if add_documents:
 
     # **STEP D: Load HR policies and management data**
     try:
-        with open(HR_DATA_PATH, 'r', encoding='utf-8') as f:
-            hr_data = json.load(f)
+        with open(HR_DATA_PATH, 'rb') as f:
+            hr_data = orjson.loads(f.read())
         
         hr_docs = []
         
@@ -186,9 +334,10 @@ if add_documents:
         
         # Process Leave Policies
         if "LeaveData" in hr_data:
-            leave_text = "Leave Policies:\n"
-            for policy in hr_data["LeaveData"].get("LeavePolicies", []):
-                leave_text += f"- {policy['Type']}: {policy['Policy']}\n"
+            leave_text = "Leave Policies:\n" + "".join(
+                f"- {policy['Type']}: {policy['Policy']}\n"
+                for policy in hr_data["LeaveData"].get("LeavePolicies", [])
+            )
             hr_docs.append(Document(
                 page_content=leave_text,
                 metadata={"source": "employee_data.json", "type": "leave_policies"}
@@ -196,9 +345,10 @@ if add_documents:
         
         # Process Salary Data
         if "SalaryData" in hr_data:
-            salary_text = "Salary Structure:\n"
-            for component in hr_data["SalaryData"].get("SalaryBreakdown", {}).get("Components", []):
-                salary_text += f"- {component['Component']}: {component['PercentageOfGrossSalary']}\n"
+            salary_text = "Salary Structure:\n" + "".join(
+                f"- {component['Component']}: {component['PercentageOfGrossSalary']}\n"
+                for component in hr_data["SalaryData"].get("SalaryBreakdown", {}).get("Components", [])
+            )
             hr_docs.append(Document(
                 page_content=salary_text,
                 metadata={"source": "employee_data.json", "type": "salary_data"}
@@ -213,30 +363,141 @@ if add_documents:
     # **STEP E: Final splitting for any large chunks**
     # Optimized chunk size for better retrieval
     text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=800,      # Reduced from 1000 for more precise chunks
-        chunk_overlap=150     # Reduced from 200 to avoid too much duplication
+        chunk_size=FINAL_CHUNK_SIZE,
+        chunk_overlap=FINAL_CHUNK_OVERLAP
     )
     
-    documents = text_splitter.split_documents(all_documents)
+    # Only documents over the chunk size need the splitter; the rest are just stripped,
+    # as the splitter would return them. Original order is kept.
+    documents = []
+    for doc in all_documents:
+        if len(doc.page_content) > FINAL_CHUNK_SIZE:
+            documents.extend(text_splitter.split_documents([doc]))
+        else:
+            doc.page_content = doc.page_content.strip()
+            if doc.page_content:
+                documents.append(doc)
     print(f"Total documents after final splitting: {len(documents)}")
+    return documents
 
-    # **STEP F: Create, embed, and persist the database**
-    vector_store = Chroma.from_documents(
-        documents=documents, 
-        embedding=embeddings, 
-        persist_directory=db_location,
-    )
-    print(f"Successfully built and saved Chroma DB at: {db_location}")
+def sync_vector_store() -> Chroma:
+    """
+    Create or update the persisted vector store from the source files.
     
-else:
-    print(f"Loading existing vector store from: {db_location}")
+    Documents get content-derived ids, so only new or changed documents are embedded and
+    added, and documents whose source content is gone are deleted.
+    """
+    documents_by_id = {_document_id(doc): doc for doc in _load_source_documents()}
+    
+    # **STEP F: Embed and persist only what changed**
+    # Chroma may overwrite an existing collection's metadata, so HNSW settings are only passed
+    # for a new store; changing them means deleting chroma_hr_db and rebuilding
     vector_store = Chroma(
         persist_directory=db_location, 
-        embedding_function=embeddings
+        embedding_function=embeddings,
+        collection_metadata=None if os.path.exists(db_location) else COLLECTION_METADATA
     )
+    existing_ids = set(vector_store.get(include=[])["ids"])
+    new_ids = [doc_id for doc_id in documents_by_id if doc_id not in existing_ids]
+    stale_ids = list(existing_ids.difference(documents_by_id))
+    
+    if new_ids:
+        vector_store.add_documents([documents_by_id[doc_id] for doc_id in new_ids], ids=new_ids)
+    if stale_ids:
+        vector_store.delete(ids=stale_ids)
+    print(f"Chroma DB at {db_location} is up to date: {len(new_ids)} added, {len(stale_ids)} removed, {len(documents_by_id)} total")
+    
+    if new_ids or stale_ids:
+        with open(SYNC_STAMP_PATH, 'w', encoding='utf-8') as f:
+            f.write(uuid.uuid4().hex)
+    return vector_store
+
+def store_version() -> Optional[str]:
+    """Token written by the last sync that changed the store, or None if there is none"""
+    try:
+        with open(SYNC_STAMP_PATH, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+_vector_store: Optional[Chroma] = None
+_vector_store_version: Optional[str] = None  # store_version() of the data _vector_store was opened on
+_vector_store_lock = threading.Lock()
+
+def get_vector_store() -> Chroma:
+    """Return the shared vector store, loading it (or building it if missing) on first use"""
+    global _vector_store, _vector_store_version
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                if os.path.exists(db_location):
+                    print(f"Loading existing vector store from: {db_location}")
+                    # Read before opening, so a sync that lands meanwhile still shows up as a change
+                    _vector_store_version = store_version()
+                    _vector_store = Chroma(
+                        client=chromadb.PersistentClient(path=db_location),
+                        embedding_function=embeddings
+                    )
+                else:
+                    print("Building new vector store...")
+                    _vector_store = sync_vector_store()
+                    _vector_store_version = store_version()
+    return _vector_store
+
+def vector_store_changed() -> bool:
+    """True if chroma_hr_db was synced (e.g. by `python vector.py`) after the open store was loaded"""
+    return _vector_store is not None and store_version() != _vector_store_version
+
+def reset_vector_store():
+    """Drop the open store and its retrievers so the next use reopens chroma_hr_db from disk"""
+    global _vector_store, _default_retriever
+    with _vector_store_lock:
+        _vector_store = None
+        _default_retriever = None
+        _retrievers_by_k.clear()
+        # chromadb 0.4 shares one System (and its in-memory HNSW index) per path, so a new client for the
+        # same path would still see the old index. Dropping the cache makes the next PersistentClient load
+        # from disk; clients already created keep their own server handle, so in-flight queries finish.
+        if hasattr(SharedSystemClient, "clear_system_cache"):
+            SharedSystemClient.clear_system_cache()
 
 # --- 3. Dynamic Retriever Function ---
 
+# Keywords that pick the retrieval type, matched as whole words, in priority order
+RETRIEVAL_TYPE_KEYWORDS = (
+    ('executive', ('coo', 'chairman', 'founder', 'ceo', 'director')),
+    ('employee_search', ('who is', 'who are', 'find employee', 'contact', 'email')),
+    ('calculation', ('calculate', 'salary', 'breakdown', 'basic salary')),
+    ('greeting', ('hello', 'hi', 'hey', 'greetings')),
+)
+
+def _keyword_alternation(keywords) -> str:
+    """Regex alternation of the keywords as whole words, allowing any whitespace inside phrases"""
+    return '|'.join(r'\s+'.join(map(re.escape, keyword.split())) for keyword in keywords)
+
+# One alternative per type, each a lookahead over the whole query, so a single match at
+# position 0 reports the highest-priority type present via lastgroup
+_RETRIEVAL_TYPE_RE = re.compile(
+    '|'.join(
+        rf'(?=.*?\b(?:{_keyword_alternation(keywords)})\b)(?P<{query_type}>)'
+        for query_type, keywords in RETRIEVAL_TYPE_KEYWORDS
+    ),
+    re.IGNORECASE | re.DOTALL
+)
+
+def get_retrieval_type(query: str) -> str:
+    """Return the TOP_K_CONFIG key for the query"""
+    match = _RETRIEVAL_TYPE_RE.match(query)
+    if match:
+        return match.lastgroup
+    # maxsplit caps the list at 16 items, which is enough to tell whether there are more than 15 words
+    if query.count('?') > 1 or len(query.split(maxsplit=15)) > 15:
+        return 'complex'
+    return 'default'
+
+# One retriever per k, built on first use and shared by every query
+_retrievers_by_k = {}
+
 def get_dynamic_retriever(query: str, k: int = None):
     """
     Returns a retriever with dynamic top-k based on query type.
@@ -249,30 +510,45 @@ def get_dynamic_retriever(query: str, k: int = None):
         Configured retriever
     """
     if k is None:
-        query_lower = query.lower()
-        
-        # Determine query type and set appropriate k
-        if any(word in query_lower for word in ['coo', 'chairman', 'founder', 'ceo', 'director']):
-            k = TOP_K_CONFIG['executive']
-        elif any(word in query_lower for word in ['who is', 'who are', 'find employee', 'contact', 'email']):
-            k = TOP_K_CONFIG['employee_search']
-        elif any(word in query_lower for word in ['calculate', 'salary', 'breakdown', 'basic salary']):
-            k = TOP_K_CONFIG['calculation']
-        elif any(word in query_lower for word in ['hello', 'hi', 'hey', 'greetings']):
-            k = TOP_K_CONFIG['greeting']
-        elif len(query.split()) > 15 or '?' in query and query.count('?') > 1:
-            k = TOP_K_CONFIG['complex']
-        else:
-            k = TOP_K_CONFIG['default']
+        k = TOP_K_CONFIG[get_retrieval_type(query)]
     
-    return vector_store.as_retriever(
-        search_kwargs={
-            "k": k,
-        }
-    )
+    dynamic_retriever = _retrievers_by_k.get(k)
+    if dynamic_retriever is None:
+        dynamic_retriever = _retrievers_by_k.setdefault(
+            k, get_vector_store().as_retriever(search_kwargs={"k": k})
+        )
+    return dynamic_retriever
+
+# --- 4. Default Retriever ---
+
+_default_retriever = None
+
+def get_default_retriever():
+    """Return the shared MMR retriever with DEFAULT_RETRIEVER_K results"""
+    global _default_retriever
+    if _default_retriever is None:
+        _default_retriever = get_vector_store().as_retriever(
+            search_type="mmr",
+            search_kwargs={
+                "k": DEFAULT_RETRIEVER_K,
+                "fetch_k": DEFAULT_RETRIEVER_FETCH_K,
+                "lambda_mult": DEFAULT_RETRIEVER_LAMBDA,
+            }
+        )
+    return _default_retriever
+
+# --- 5. Lazy Module Attributes ---
 
-# --- 4. Create Default Retriever ---
-retriever = vector_store.as_retriever(search_kwargs={"k": 10})
+def __getattr__(name: str):
+    """Keep `vector.vector_store` and `vector.retriever` available; both load the store on first access"""
+    if name == 'vector_store':
+        return get_vector_store()
+    if name == 'retriever':
+        return get_default_retriever()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-print(f"Retriever initialized successfully with default k=10")
-print(f"Dynamic retriever available via get_dynamic_retriever()")
+if __name__ == "__main__":
+    # Running the module syncs the store with the source files; the server only loads it
+    _vector_store = sync_vector_store()
+    print(f"Retriever initialized successfully with default k={DEFAULT_RETRIEVER_K}")
+    print(f"Dynamic retriever available via get_dynamic_retriever()")